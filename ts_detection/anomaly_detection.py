@@ -1,22 +1,25 @@
 import pandas as pd
 import numpy as np
 import json
+import math
 from datetime import datetime
 from statsmodels.tsa.seasonal import STL
 import warnings
 warnings.filterwarnings('ignore')
 
 class AnomalyDetector:
-    def __init__(self, lower_percentile=0.5, upper_percentile=99.5):
+    def __init__(self, lower_percentile=0.5, upper_percentile=99.5, fast_stl=True):
         """
         初始化异常检测器
         
         Args:
             lower_percentile (float): 下界百分位数，默认0.5%
             upper_percentile (float): 上界百分位数，默认99.5%
+            fast_stl (bool): 趋势和低通平滑按约period/10的步长做LOESS并插值，默认开启
         """
         self.lower_percentile = lower_percentile
         self.upper_percentile = upper_percentile
+        self.fast_stl = fast_stl
     
     def load_data(self, file_path):
         """
@@ -30,8 +33,8 @@ class AnomalyDetector:
         """
         try:
             df = pd.read_csv(file_path)
-            # 确保时间列格式正确
-            df['time'] = pd.to_datetime(df['time'])
+            # 确保时间列格式正确（时间戳均为ISO格式，显式指定以走固定的快速解析路径）
+            df['time'] = pd.to_datetime(df['time'], format='ISO8601')
             return df
         except Exception as e:
             raise Exception(f"数据加载失败: {str(e)}")
@@ -55,8 +58,14 @@ class AnomalyDetector:
         # 确保周期至少为2
         period = max(2, period)
         
+        # 趋势/低通平滑窗口随周期增长，是STL的主要耗时；每隔jump个点计算一次LOESS，
+        # 其余点线性插值。jump取ceil(period/10)，小于R的stl按ceil(window/10)取的默认步长
+        # （趋势和低通窗口都大于period），近似更保守，残差会有小幅变化
+        jump = max(1, math.ceil(period / 10)) if self.fast_stl else 1
+        
         try:
-            stl_result = STL(data, period=period, robust=True).fit()
+            stl_result = STL(data, period=period, robust=True,
+                             trend_jump=jump, low_pass_jump=jump).fit()
             return {
                 'trend': stl_result.trend,
                 'seasonal': stl_result.seasonal,
@@ -86,43 +95,61 @@ class AnomalyDetector:
         Returns:
             list: 异常值列表
         """
-        # 按时间排序
-        data = data.sort_values('time').reset_index(drop=True)
+        # 按时间排序（已有序时跳过）
+        times = pd.DatetimeIndex(pd.to_datetime(data['time'], utc=True))
+        ts = times.to_numpy(dtype='datetime64[ns]')
+        values = data['value'].to_numpy(dtype=np.float64)
+        if not np.all(ts[1:] >= ts[:-1]):
+            order = np.argsort(ts, kind='stable')
+            times = times[order]
+            values = values[order]
         
         # 执行STL分解
-        decomposition = self.stl_decomposition(data['value'].values)
-        residuals = decomposition['residual']
+        decomposition = self.stl_decomposition(values)
+        residuals = np.asarray(decomposition['residual'], dtype=np.float64)
+        
+        # 计算残差的百分位数（一次调用同时求上下界，只对残差做一次排序）
+        lower_bound, upper_bound = np.percentile(
+            residuals, [self.lower_percentile, self.upper_percentile]
+        ).tolist()
         
-        # 计算残差的百分位数
-        lower_bound = np.percentile(residuals, self.lower_percentile)
-        upper_bound = np.percentile(residuals, self.upper_percentile)
+        # 找出异常值：先用NumPy向量化比较得到越界点下标，只在异常点上做Python循环；
+        # 偏低掩码同时用于筛选和判断异常类型，循环内不再重复比较
+        is_low = residuals < lower_bound
+        anomaly_idx = np.flatnonzero(is_low | (residuals > upper_bound))
         
-        # 找出异常值
+        # 单位和PromQL标签对同一组数据是固定的，只计算一次
+        unit = self._extract_unit(metric_name)
+        label = f"{metric_name}{{host=\"{host}\"}}"  # PromQL格式
+        descriptions = {t: f"({metric_name},{unit},{t})" for t in ("偏低", "偏高")}
+        
+        # 一次性取出异常点的切片并转为Python对象，避免逐点索引NumPy标量；
+        # 时间戳整体格式化一次，startTime和endTime共用同一个字符串
+        time_strs = times[anomaly_idx].strftime("%Y-%m-%dT%H:%M:%S+00:00")
         anomalies = []
-        for idx, (time, value, residual) in enumerate(zip(data['time'], data['value'], residuals)):
-            if residual < lower_bound or residual > upper_bound:
-                # 判断异常类型
-                if residual < lower_bound:
-                    anomaly_type = "偏低"
-                    threshold = lower_bound
-                else:
-                    anomaly_type = "偏高"
-                    threshold = upper_bound
-                
-                # 获取单位（从指标名称推断）
-                unit = self._extract_unit(metric_name)
-                
-                anomalies.append({
-                    "label": f"{metric_name}{{host=\"{host}\"}}",  # PromQL格式
-                    "host": host,
-                    "startTime": time.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
-                    "endTime": time.strftime("%Y-%m-%dT%H:%M:%S+00:00"),
-                    "异常描述": f"({metric_name},{unit},{anomaly_type})",
-                    "original_value": float(value),
-                    "residual": float(residual),
-                    "threshold": float(threshold),
-                    "anomaly_type": anomaly_type
-                })
+        for time_str, value, residual, low in zip(time_strs,
+                                                  values[anomaly_idx].tolist(),
+                                                  residuals[anomaly_idx].tolist(),
+                                                  is_low[anomaly_idx].tolist()):
+            # 判断异常类型
+            if low:
+                anomaly_type = "偏低"
+                threshold = lower_bound
+            else:
+                anomaly_type = "偏高"
+                threshold = upper_bound
+            
+            anomalies.append({
+                "label": label,
+                "host": host,
+                "startTime": time_str,
+                "endTime": time_str,
+                "异常描述": descriptions[anomaly_type],
+                "original_value": value,
+                "residual": residual,
+                "threshold": threshold,
+                "anomaly_type": anomaly_type
+            })
         
         return anomalies
     
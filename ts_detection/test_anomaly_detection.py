@@ -4,6 +4,8 @@
 测试异常检测系统
 """
 
+import os
+import pytest
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
@@ -87,5 +89,42 @@ def test_anomaly_detection():
         os.remove(test_file)
         print(f"已清理测试文件: {test_file}")
 
+def test_fast_stl_flags_same_points():
+    """测试fast_stl近似分解与逐点STL在示例数据上标记相同的异常点"""
+    data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    for file_name in ['cpu_usage_percentage_filtered.csv', 'heap_memory_filtered.csv']:
+        file_path = os.path.join(data_dir, file_name)
+        fast_results = AnomalyDetector(fast_stl=True).process_file(file_path)
+        exact_results = AnomalyDetector(fast_stl=False).process_file(file_path)
+        
+        fast_points = [(a['startTime'], a['anomaly_type']) for a in fast_results['anomalies']]
+        exact_points = [(a['startTime'], a['anomaly_type']) for a in exact_results['anomalies']]
+        assert fast_points == exact_points, file_name
+
+def _to_object_dtype(df):
+    """time列转为object类型的Timestamp"""
+    return df.assign(time=df['time'].astype(object))
+
+def _to_mixed_offsets(df):
+    """UTC与Asia/Shanghai交替的Timestamp，load_data遇到混合偏移时会得到这种object列"""
+    return df.assign(time=[t.tz_convert('Asia/Shanghai') if i % 2 else t
+                           for i, t in enumerate(df['time'])])
+
+def _shuffle(df):
+    """打乱行顺序，检测前需要先按时间排序"""
+    return df.sample(frac=1, random_state=0)
+
+@pytest.mark.parametrize("transform", [_to_object_dtype, _to_mixed_offsets, _shuffle])
+def test_time_column_variants_match(transform):
+    """测试time列的不同形式与有序的datetime类型输入检测结果一致"""
+    df = create_test_data()
+    df['time'] = pd.to_datetime(df['time'])
+    detector = AnomalyDetector()
+    expected = detector.detect_anomalies(df, 'test_metric', 'test_host:8080')
+    assert len(expected) > 0
+    
+    variant_df = transform(df)
+    assert detector.detect_anomalies(variant_df, 'test_metric', 'test_host:8080') == expected
+
 if __name__ == "__main__":
     test_anomaly_detection()